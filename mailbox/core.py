@@ -1,10 +1,18 @@
 from typing import Dict, Optional, Union
-from urllib.parse import urlparse
 
 from .message import OutgoingMail, MailMessage, MailboxStatus, FetchOptions
 from .provider import MailboxProvider, Subscription, AckableMessage
 from .error import ProviderNotFound
 
+# Leading characters urlparse strips before reading the scheme: C0 controls and space.
+_C0_CONTROL_OR_SPACE = ''.join(chr(i) for i in range(0x21))
+
+def _get_scheme(address: str) -> str:
+    # Only the scheme is needed to route to a provider, so avoid a full urlparse here.
+    # Strip like urlparse does, so routing agrees with get_canonical_mailbox_address_identifier.
+    scheme, sep, _ = address.lstrip(_C0_CONTROL_OR_SPACE).partition(':')
+    return scheme.lower() if sep else ''
+
 class Mailbox:
     def __init__(self):
         self.providers: Dict[str, MailboxProvider] = {}
@@ -13,21 +21,14 @@ class Mailbox:
         self.providers[provider.protocol] = provider
 
     def _get_provider(self, protocol: str) -> MailboxProvider:
-        # Protocol usually comes with ':', so we might need to strip it if the map keys don't have it.
-        # In TS, it does `protocol.slice(0, -1)`.
-        # Here, we assume the provider.protocol returns "mem" (without colon).
-        # And the URL protocol is "mem:".
-        key = protocol
-        if protocol.endswith(':'):
-            key = protocol[:-1]
-
-        if key not in self.providers:
-            raise ProviderNotFound(key)
-        return self.providers[key]
+        # Protocol is the bare scheme (e.g. "mem"), matching provider.protocol.
+        provider = self.providers.get(protocol)
+        if provider is None:
+            raise ProviderNotFound(protocol)
+        return provider
 
     async def post(self, mail: OutgoingMail) -> MailMessage:
-        parsed_to = urlparse(mail.to)
-        provider = self._get_provider(parsed_to.scheme)
+        provider = self._get_provider(_get_scheme(mail.to))
 
         message_id = mail.id if mail.id else provider.generate_id()
 
@@ -36,16 +37,13 @@ class Mailbox:
         return await provider.send(message)
 
     async def subscribe(self, address: str, on_receive: callable) -> Subscription:
-        parsed_address = urlparse(address)
-        provider = self._get_provider(parsed_address.scheme)
+        provider = self._get_provider(_get_scheme(address))
         return await provider.subscribe(address, on_receive)
 
     async def fetch(self, address: str, options: FetchOptions) -> Union[MailMessage, AckableMessage, None]:
-        parsed_address = urlparse(address)
-        provider = self._get_provider(parsed_address.scheme)
+        provider = self._get_provider(_get_scheme(address))
         return await provider.fetch(address, options)
 
     async def status(self, address: str) -> MailboxStatus:
-        parsed_address = urlparse(address)
-        provider = self._get_provider(parsed_address.scheme)
+        provider = self._get_provider(_get_scheme(address))
         return await provider.status(address)
@@ -1,7 +1,14 @@
 from typing import Any, Dict, Optional
 from dataclasses import dataclass, field
+import sys
 
-@dataclass
+# slots=True is only available on Python 3.10+; older versions keep __dict__-backed instances.
+_DATACLASS_OPTIONS: Dict[str, Any] = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# Bound once so MailMessage.from_outgoing allocates without a per-call type attribute lookup.
+_new_object = object.__new__
+
+@dataclass(**_DATACLASS_OPTIONS)
 class OutgoingMail:
     """
     Represents a message to be sent.
@@ -13,7 +20,7 @@ class OutgoingMail:
     headers: Dict[str, str] = field(default_factory=dict)
     meta: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class MailMessage:
     """
     Represents a message in the system.
@@ -27,16 +34,17 @@ class MailMessage:
 
     @classmethod
     def from_outgoing(cls, outgoing: OutgoingMail, id: str) -> 'MailMessage':
-        return cls(
-            id=id,
-            from_=outgoing.from_,
-            to=outgoing.to,
-            body=outgoing.body,
-            headers=outgoing.headers,
-            meta=outgoing.meta
-        )
+        # Skip __init__ keyword handling; every field is assigned below.
+        message = _new_object(cls)
+        message.id = id
+        message.from_ = outgoing.from_
+        message.to = outgoing.to
+        message.body = outgoing.body
+        message.headers = outgoing.headers
+        message.meta = outgoing.meta
+        return message
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class MailboxStatus:
     """
     Represents the status of a mailbox address.
@@ -46,7 +54,7 @@ class MailboxStatus:
     last_activity_time: Optional[str] = None
     extra: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class FetchOptions:
     """
     Options for fetching messages.
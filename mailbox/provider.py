@@ -1,10 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import Any, Callable, Awaitable, Optional, Union
-from datetime import datetime, timezone
+from typing import Any, Callable, Awaitable, Dict, Optional, Union
+import asyncio
 import uuid
 
 from .message import MailMessage, MailboxStatus, FetchOptions
 from .error import MailboxError
+from .utils import utc_now_isoformat
 
 # Type alias for the receive callback
 OnReceiveCallback = Callable[[MailMessage], Awaitable[None]]
@@ -13,6 +14,8 @@ class Subscription(ABC):
     """
     Represents an active subscription.
     """
+    __slots__ = ()
+
     @abstractmethod
     async def unsubscribe(self) -> None:
         pass
@@ -37,16 +40,44 @@ class AckableMessage:
     async def nack(self, requeue: bool = False) -> None:
         await self._nack_fn(requeue)
 
+# Queued behind a subscription's remaining messages to stop its worker once they are delivered.
+_STOP = object()
+
+def _is_cancelling() -> bool:
+    """
+    Returns True if the current task itself has been cancelled, as opposed to having
+    an awaited call raise CancelledError. Before Python 3.11 the two can't be told
+    apart, so any CancelledError is treated as cancelling the task.
+    """
+    cancelling = getattr(asyncio.current_task(), 'cancelling', None)
+    return cancelling is None or cancelling() > 0
+
+class _SubInfo:
+    """
+    Bookkeeping for an active subscription: its address, the provider's unsubscribe handle,
+    and the queue and task delivering its messages.
+    """
+    __slots__ = ('address', 'handle', 'queue', 'worker')
+
+    def __init__(self, address: str, handle: Any, queue: 'asyncio.Queue[Any]', worker: 'asyncio.Future[None]'):
+        self.address = address
+        self.handle = handle
+        self.queue = queue
+        self.worker = worker
+
 class MailboxProvider(ABC):
     """
     Abstract base class for mailbox providers.
     """
+    # Seconds an 'mbx-sent-at' stamp may be reused for; set to 0 for exact per-message times.
+    timestamp_resolution: float = 0.001
+
     def __init__(self, protocol: str):
         self.protocol = protocol
-        self._subscriptions: Dict[str, Any] = {} # Map sub_id to internal handle/info
+        self._subscriptions: Dict[str, _SubInfo] = {} # Map sub_id to internal handle/info
 
     def generate_id(self) -> str:
-        return str(uuid.uuid4())
+        return uuid.uuid4().hex
 
     async def send(self, message: MailMessage) -> MailMessage:
         """
@@ -54,7 +85,7 @@ class MailboxProvider(ABC):
         """
         # Inject mbx-sent-at
         if 'mbx-sent-at' not in message.headers:
-            message.headers['mbx-sent-at'] = datetime.now(timezone.utc).isoformat()
+            message.headers['mbx-sent-at'] = utc_now_isoformat(self.timestamp_resolution)
 
         await self._send(message)
         return message
@@ -65,23 +96,74 @@ class MailboxProvider(ABC):
         """
         sub_id = self.generate_id()
 
-        async def wrapped_on_receive(message: MailMessage):
-            try:
-                await on_receive(message)
-                # Implicit ACK
-                await self.ack(message)
-            except Exception as e:
-                await self._handle_receive_error(e, message)
+        if self._overrides('ack', '_ack'):
+            async def wrapped_on_receive(message: MailMessage):
+                try:
+                    await on_receive(message)
+                    # Implicit ACK
+                    await self.ack(message)
+                except Exception as e:
+                    await self._handle_receive_error(e, message)
+        else:
+            # ACK is a no-op for this provider, so skip awaiting it for every message,
+            # and when NACK is a no-op as well, report errors without awaiting either.
+            sync_errors = not self._overrides('nack', '_nack', '_handle_receive_error')
+
+            async def wrapped_on_receive(message: MailMessage):
+                try:
+                    await on_receive(message)
+                except Exception as e:
+                    if sync_errors:
+                        self._handle_receive_error_sync(e, message)
+                    else:
+                        await self._handle_receive_error(e, message)
+
+        # One long-lived task per subscription drains its queue, so delivering a message
+        # is just a put; messages reach on_receive one at a time, in order. The queue is
+        # unbounded, so the put never suspends and senders never wait on slow handlers;
+        # a handler that stays slower than its senders lets the queue grow without limit.
+        queue: 'asyncio.Queue[MailMessage]' = asyncio.Queue()
+
+        async def deliver():
+            while True:
+                message = await queue.get()
+                if message is _STOP:
+                    return
+                # A failing delivery must not take the worker, and with it the subscription, down.
+                try:
+                    await wrapped_on_receive(message)
+                except asyncio.CancelledError as e:
+                    if _is_cancelling():
+                        raise
+                    self._handle_receive_error_sync(e, message)
+                except Exception as e:
+                    self._handle_receive_error_sync(e, message)
+
+        async def enqueue(message: MailMessage):
+            if worker.done():
+                # Nothing will drain the queue any more; drop the subscription instead.
+                await self._release_subscription(sub_id)
+            else:
+                queue.put_nowait(message)
+
+        def on_worker_done(_):
+            # The worker only ends by itself after unsubscribe, which already released the
+            # subscription. Otherwise it was cancelled, e.g. by its loop shutting down.
+            if sub_id in self._subscriptions:
+                asyncio.ensure_future(self._release_subscription(sub_id))
+
+        worker = asyncio.ensure_future(deliver())
 
         # Call concrete implementation
-        unsubscribe_handle = await self._subscribe(address, wrapped_on_receive)
+        try:
+            unsubscribe_handle = await self._subscribe(address, enqueue)
+        except BaseException:
+            worker.cancel()
+            raise
 
         # Store subscription info
-        self._subscriptions[sub_id] = {
-            'id': sub_id,
-            'address': address,
-            'handle': unsubscribe_handle
-        }
+        self._subscriptions[sub_id] = _SubInfo(address, unsubscribe_handle, queue, worker)
+        worker.add_done_callback(on_worker_done)
 
         return self._create_subscription_object(sub_id)
 
@@ -138,22 +220,51 @@ class MailboxProvider(ABC):
         """Optional: Implement if the provider supports NACK."""
         pass
 
-    async def _handle_receive_error(self, error: Exception, message: MailMessage) -> None:
+    def _handle_receive_error_sync(self, error: BaseException, message: MailMessage) -> None:
+        """Reports a receive error. Used on its own when the provider's NACK is a no-op."""
         print(f"[{self.protocol}] Error processing message {message.id}: {error}")
+
+    async def _handle_receive_error(self, error: Exception, message: MailMessage) -> None:
+        self._handle_receive_error_sync(error, message)
         # Default strategy: NACK with requeue if it looks transient?
         # For now, let's just NACK without requeue to avoid infinite loops unless we have retry logic.
         # Or maybe requeue=True for connection errors.
         # Simple implementation:
         await self.nack(message, requeue=False)
 
+    def _overrides(self, *names: str) -> bool:
+        """Returns True if the concrete provider overrides any of the named base-class methods."""
+        cls = type(self)
+        return any(getattr(cls, name) is not getattr(MailboxProvider, name) for name in names)
+
+    async def _release_subscription(self, sub_id: str) -> Optional[_SubInfo]:
+        """Forgets a subscription and detaches it from the provider; returns its info if it was active."""
+        info = self._subscriptions.pop(sub_id, None)
+        if info is not None:
+            await self._unsubscribe(sub_id, info.handle)
+        return info
+
     def _create_subscription_object(self, sub_id: str) -> Subscription:
-        provider = self
+        return _ConcreteSubscription(self, sub_id)
 
-        class ConcreteSubscription(Subscription):
-            async def unsubscribe(self) -> None:
-                if sub_id in provider._subscriptions:
-                    info = provider._subscriptions[sub_id]
-                    await provider._unsubscribe(sub_id, info['handle'])
-                    del provider._subscriptions[sub_id]
+class _ConcreteSubscription(Subscription):
+    """
+    Subscription handle returned by MailboxProvider.subscribe.
+    """
+    __slots__ = ('_provider', '_sub_id')
+
+    def __init__(self, provider: MailboxProvider, sub_id: str):
+        self._provider = provider
+        self._sub_id = sub_id
 
-        return ConcreteSubscription()
+    async def unsubscribe(self) -> None:
+        info = self._provider._subscriptions.get(self._sub_id)
+        if info is not None:
+            try:
+                await self._provider._release_subscription(self._sub_id)
+            finally:
+                # Let the worker deliver what was already queued, then stop. It is not
+                # cancelled, so a handler may unsubscribe its own subscription. Queueing the
+                # stop on the next loop iteration puts it behind deliveries that were
+                # scheduled rather than made inline.
+                asyncio.get_event_loop().call_soon(info.queue.put_nowait, _STOP)
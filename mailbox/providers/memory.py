@@ -1,5 +1,8 @@
 from typing import Dict, List, Any, Optional, Union, Callable, Awaitable
 import asyncio
+import contextvars
+import time
+import types
 from datetime import datetime, timezone
 
 from ..provider import MailboxProvider, AckableMessage, OnReceiveCallback
@@ -7,13 +10,68 @@ from ..message import MailMessage, MailboxStatus, FetchOptions
 from ..utils import get_canonical_mailbox_address_identifier
 from .queue import MailMessageQueue
 
+_UTC = timezone.utc
+_fromtimestamp = datetime.fromtimestamp
+
+@types.coroutine
+def _drive(coro, yielded, context):
+    # Forward every suspension of `coro` to the task running us, so awaited
+    # futures are waited on exactly as if `coro` itself were the task.
+    # Each step runs in the listener's own context, as it would in a task.
+    while True:
+        try:
+            value = yield yielded
+        except BaseException as e:
+            try:
+                yielded = context.run(coro.throw, e)
+            except StopIteration as stop:
+                return stop.value
+        else:
+            try:
+                yielded = context.run(coro.send, value)
+            except StopIteration as stop:
+                return stop.value
+
+async def _resume(coro, yielded, context):
+    return await _drive(coro, yielded, context)
+
+def _dispatch(listener: OnReceiveCallback, message: MailMessage) -> None:
+    # Run the listener inline until it first suspends; only a listener that
+    # actually awaits something pays for a Task. This is done by hand rather
+    # than with 3.12+ eager tasks, which allocate a Task even for listeners that
+    # never suspend. Like create_task, the listener gets a copy of the
+    # publisher's context, so its contextvar changes stay its own. Until it
+    # first suspends, current_task() still reports the publisher.
+    context = contextvars.copy_context()
+    coro = listener(message)
+    try:
+        yielded = context.run(coro.send, None)
+    except StopIteration:
+        return
+    except (Exception, asyncio.CancelledError) as e:
+        # Report it like an exception in a task; it must not abort the publish.
+        asyncio.get_event_loop().call_exception_handler({
+            'message': 'Unhandled exception in mailbox listener',
+            'exception': e,
+        })
+        return
+    asyncio.ensure_future(_resume(coro, yielded, context))
+
+def _schedule(listener: OnReceiveCallback, message: MailMessage) -> None:
+    # Every listener runs as its own task, starting on a later loop iteration.
+    asyncio.ensure_future(listener(message))
+
+def _get_message_id(message: MailMessage) -> str:
+    return message.id
+
 class MemoryEventBus:
     _instance = None
 
     def __init__(self):
         self.topics: Dict[str, List[OnReceiveCallback]] = {}
         self.queue: MailMessageQueue[MailMessage] = MailMessageQueue()
-        self.last_activity: Dict[str, str] = {}
+        # time.time() of the last activity; formatted only when status is requested
+        self.last_activity: Dict[str, float] = {}
 
     @classmethod
     def get_instance(cls):
@@ -22,42 +80,72 @@ class MemoryEventBus:
         return cls._instance
 
     def subscribe(self, topic: str, listener: OnReceiveCallback) -> Callable[[], None]:
-        if topic not in self.topics:
-            self.topics[topic] = []
-        self.topics[topic].append(listener)
-        self.last_activity[topic] = datetime.now(timezone.utc).isoformat()
+        self.topics.setdefault(topic, []).append(listener)
+        self.last_activity[topic] = time.time()
 
-        def unsubscribe():
-            if topic in self.topics:
+        def unsubscribe(_topics=self.topics, _topic=topic, _listener=listener):
+            listeners = _topics.get(_topic)
+            if listeners:
                 try:
-                    self.topics[topic].remove(listener)
+                    listeners.remove(_listener)
                 except ValueError:
                     pass
         return unsubscribe
 
-    async def publish(self, topic: str, message: MailMessage) -> None:
-        self.last_activity[topic] = datetime.now(timezone.utc).isoformat()
+    async def publish(self, topic: str, message: MailMessage, eager: bool = True) -> None:
+        """
+        Delivers a message to the topic's listeners and enqueues it for pull consumers.
+        With eager=True, listeners run inline until they first suspend; with eager=False,
+        each listener is scheduled as a task and starts only after publish returns.
+        """
+        self.last_activity[topic] = time.time()
 
         # Push to subscribers
-        if topic in self.topics:
-            for listener in self.topics[topic]:
-                # Execute listener (fire and forget or await?)
-                # In Rust/TS it's async. Here we await it to ensure order or spawn task?
-                # TS: listeners.forEach(listener => listener(message)); -> fire and forget if async?
-                # Rust: tokio::spawn -> fire and forget
-                # Python: asyncio.create_task -> fire and forget
-                asyncio.create_task(listener(message))
+        listeners = self.topics.get(topic)
+        if listeners:
+            # Listeners are started eagerly and may unsubscribe while we iterate,
+            # so iterate over a snapshot.
+            dispatch = _dispatch if eager else _schedule
+            for listener in tuple(listeners):
+                # Fire and forget, like tokio::spawn in Rust and listener(message) in TS.
+                dispatch(listener, message)
 
         # Enqueue for pull consumers
         self.queue.enqueue(topic, message)
 
+    async def publish_batch(self, topic: str, messages: List[MailMessage], eager: bool = True) -> None:
+        """
+        Publishes several messages to the same topic, resolving the topic's
+        listeners and activity timestamp once for the whole batch.
+        """
+        if not messages:
+            return
+        self.last_activity[topic] = time.time()
+
+        listeners = self.topics.get(topic)
+        if listeners:
+            listeners = tuple(listeners)
+            dispatch = _dispatch if eager else _schedule
+            for message in messages:
+                for listener in listeners:
+                    dispatch(listener, message)
+
+        enqueue = self.queue.enqueue
+        for message in messages:
+            enqueue(topic, message)
+
     def fetch_and_forget(self, topic: str) -> Optional[MailMessage]:
-        self.last_activity[topic] = datetime.now(timezone.utc).isoformat()
-        return self.queue.dequeue(topic)
+        message = self.queue.dequeue(topic)
+        # An empty poll is not activity; keep it down to the queue lookup.
+        if message is not None:
+            self.last_activity[topic] = time.time()
+        return message
 
     def fetch_for_ack(self, topic: str, timeout: Optional[float]) -> Optional[MailMessage]:
-        self.last_activity[topic] = datetime.now(timezone.utc).isoformat()
-        return self.queue.dequeue_for_ack(topic, timeout, lambda m: m.id)
+        message = self.queue.dequeue_for_ack(topic, timeout, _get_message_id)
+        if message is not None:
+            self.last_activity[topic] = time.time()
+        return message
 
     def ack(self, message_id: str) -> None:
         self.queue.ack(message_id)
@@ -71,28 +159,43 @@ class MemoryEventBus:
     def get_status(self, topic: str) -> Dict[str, Any]:
         unread_count = self.queue.get_status(topic)
         subscriber_count = len(self.topics.get(topic, []))
+        last_activity = self.last_activity.get(topic)
+        if last_activity is not None:
+            last_activity_time = _fromtimestamp(last_activity, _UTC).isoformat()
+        else:
+            last_activity_time = None
         return {
             'unread_count': unread_count,
-            'last_activity_time': self.last_activity.get(topic),
+            'last_activity_time': last_activity_time,
             'subscriber_count': subscriber_count
         }
 
 class MemoryProvider(MailboxProvider):
-    def __init__(self):
+    def __init__(self, eager_dispatch: bool = True):
+        """
+        eager_dispatch: Run the bus listeners inline during send, until they first suspend.
+        For subscriptions made through subscribe, the listener only hands the message to
+        the subscription's queue; the callback itself always runs later on the
+        subscription's worker task. Set to False to schedule each listener as a separate
+        task that starts after send returns; this costs one Task per message per
+        subscription just to enqueue the message, and buys nothing for subscribe callers
+        since their callbacks run after send returns either way.
+        """
         super().__init__("mem")
         self.bus = MemoryEventBus.get_instance()
+        self.eager_dispatch = eager_dispatch
 
     async def _send(self, message: MailMessage) -> None:
         topic = get_canonical_mailbox_address_identifier(message.to)
-        await self.bus.publish(topic, message)
+        await self.bus.publish(topic, message, self.eager_dispatch)
 
     async def _subscribe(self, address: str, on_receive: OnReceiveCallback) -> Any:
         topic = get_canonical_mailbox_address_identifier(address)
         return self.bus.subscribe(topic, on_receive)
 
     async def _unsubscribe(self, subscription_id: str, unsubscribe_handle: Any) -> None:
-        if callable(unsubscribe_handle):
-            unsubscribe_handle()
+        # Always the function returned by MemoryEventBus.subscribe
+        unsubscribe_handle()
 
     async def _fetch(self, address: str, options: FetchOptions) -> Union[MailMessage, AckableMessage, None]:
         topic = get_canonical_mailbox_address_identifier(address)
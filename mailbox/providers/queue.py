@@ -1,23 +1,20 @@
-from typing import TypeVar, Generic, Dict, Deque, Optional, List
-from collections import deque
+from typing import TypeVar, Generic, Dict, Deque, Optional, List, Tuple
+from collections import deque, defaultdict, OrderedDict
 from datetime import datetime, timedelta
 import time
 
 T = TypeVar('T')
 
-class InFlightMessage(Generic[T]):
-    def __init__(self, message: T, topic: str):
-        self.message = message
-        self.topic = topic
-        self.timestamp = time.time()
-
 class MailMessageQueue(Generic[T]):
     """
     A generic message queue that supports ack/nack and in-flight tracking.
     """
     def __init__(self):
         self.queues: Dict[str, Deque[T]] = {}
-        self.in_flight: Dict[str, InFlightMessage[T]] = {}
+        # msg_id -> (message, topic, timestamp)
+        self.in_flight: Dict[str, Tuple[T, str, float]] = {}
+        # topic -> {msg_id: timestamp}, oldest first, so stale scans stop at the first fresh entry
+        self.in_flight_by_topic: Dict[str, 'OrderedDict[str, float]'] = defaultdict(OrderedDict)
 
     def enqueue(self, topic: str, message: T) -> None:
         if topic not in self.queues:
@@ -25,8 +22,9 @@ class MailMessageQueue(Generic[T]):
         self.queues[topic].append(message)
 
     def dequeue(self, topic: str) -> Optional[T]:
-        if topic in self.queues and self.queues[topic]:
-            return self.queues[topic].popleft()
+        queue = self.queues.get(topic)
+        if queue:
+            return queue.popleft()
         return None
 
     def dequeue_for_ack(self, topic: str, ack_timeout: Optional[float], get_id_fn: callable) -> Optional[T]:
@@ -34,26 +32,37 @@ class MailMessageQueue(Generic[T]):
         Dequeues a message and moves it to in-flight.
         get_id_fn: A function that takes a message (T) and returns its ID (str).
         """
+        now = None
         if ack_timeout:
-            self.requeue_stale(topic, ack_timeout)
+            by_id = self.in_flight_by_topic.get(topic)
+            if by_id:
+                now = time.monotonic()
+                # Entries are oldest first, so nothing is stale before the first one's deadline
+                if now - next(iter(by_id.values())) > ack_timeout:
+                    self.requeue_stale(topic, ack_timeout, now)
 
-        if topic in self.queues and self.queues[topic]:
-            message = self.queues[topic].popleft()
+        queue = self.queues.get(topic)
+        if queue:
+            message = queue.popleft()
             msg_id = get_id_fn(message)
 
-            self.in_flight[msg_id] = InFlightMessage(message, topic)
+            # A reused ID must not keep its old position in the topic index
+            self._pop_in_flight(msg_id)
+            if now is None:
+                now = time.monotonic()
+            self.in_flight[msg_id] = (message, topic, now)
+            self.in_flight_by_topic[topic][msg_id] = now
             return message
         return None
 
     def ack(self, message_id: str) -> None:
-        if message_id in self.in_flight:
-            del self.in_flight[message_id]
+        self._pop_in_flight(message_id)
 
     def nack(self, message_id: str, requeue: bool) -> None:
-        if message_id in self.in_flight:
-            flight = self.in_flight.pop(message_id)
-            if requeue:
-                self.requeue_internal(flight.topic, flight.message)
+        entry = self._pop_in_flight(message_id)
+        if entry is not None and requeue:
+            message, topic, _ = entry
+            self.requeue_internal(topic, message)
 
     def get_status(self, topic: str) -> int:
         return len(self.queues.get(topic, []))
@@ -63,14 +72,26 @@ class MailMessageQueue(Generic[T]):
             self.queues[topic] = deque()
         self.queues[topic].appendleft(message)
 
-    def requeue_stale(self, topic: str, timeout: float) -> None:
-        now = time.time()
+    def requeue_stale(self, topic: str, timeout: float, now: Optional[float] = None) -> None:
+        if now is None:
+            now = time.monotonic()
         stale_ids = []
 
-        for msg_id, flight in self.in_flight.items():
-            if flight.topic == topic and (now - flight.timestamp) > timeout:
-                stale_ids.append(msg_id)
+        for msg_id, timestamp in self.in_flight_by_topic.get(topic, {}).items():
+            if (now - timestamp) <= timeout:
+                break
+            stale_ids.append(msg_id)
 
         for msg_id in stale_ids:
-            flight = self.in_flight.pop(msg_id)
-            self.requeue_internal(flight.topic, flight.message)
+            message, _, _ = self._pop_in_flight(msg_id)
+            self.requeue_internal(topic, message)
+
+    def _pop_in_flight(self, message_id: str) -> Optional[Tuple[T, str, float]]:
+        entry = self.in_flight.pop(message_id, None)
+        if entry is not None:
+            topic = entry[1]
+            by_id = self.in_flight_by_topic[topic]
+            del by_id[message_id]
+            if not by_id:
+                del self.in_flight_by_topic[topic]
+        return entry
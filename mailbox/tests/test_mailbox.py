@@ -1,6 +1,13 @@
 import asyncio
+import contextlib
+import contextvars
+import io
+import sys
 import unittest
-from mailbox import Mailbox, MemoryProvider, OutgoingMail, FetchOptions, MailboxStatus
+from unittest import mock
+from urllib.parse import urlparse
+from mailbox import utils
+from mailbox import Mailbox, MemoryProvider, OutgoingMail, MailMessage, FetchOptions, MailboxStatus
 
 class TestMailbox(unittest.IsolatedAsyncioTestCase):
     async def asyncSetUp(self):
@@ -32,6 +39,340 @@ class TestMailbox(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(received_msgs[0].body, {"hello": "world"})
         self.assertIn('mbx-sent-at', received_msgs[0].headers)
 
+    async def test_subscribe_handler_error(self):
+        address = "mem:test/error"
+        received_msgs = []
+
+        async def on_receive(msg):
+            if msg.body == "bad":
+                raise ValueError("boom")
+            received_msgs.append(msg)
+
+        await self.mailbox.subscribe(address, on_receive)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            for body in ("bad", "good"):
+                await self.mailbox.post(OutgoingMail(
+                    from_="mem:test/sender",
+                    to=address,
+                    body=body
+                ))
+            await asyncio.sleep(0.1)
+
+        self.assertEqual([m.body for m in received_msgs], ["good"])
+        self.assertIn("boom", output.getvalue())
+
+    async def test_subscribe_survives_failing_nack(self):
+        class FailingNackProvider(MemoryProvider):
+            async def _nack(self, message, requeue):
+                raise RuntimeError("nack failed")
+
+        mailbox = Mailbox()
+        mailbox.register_provider(FailingNackProvider())
+        address = "mem:test/failing-nack"
+        received_msgs = []
+
+        async def on_receive(msg):
+            if msg.body == "bad":
+                raise ValueError("boom")
+            received_msgs.append(msg)
+
+        await mailbox.subscribe(address, on_receive)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            for body in ("bad", "good1", "good2"):
+                await mailbox.post(OutgoingMail(
+                    from_="mem:test/sender",
+                    to=address,
+                    body=body
+                ))
+            await asyncio.sleep(0.1)
+
+        self.assertEqual([m.body for m in received_msgs], ["good1", "good2"])
+        self.assertIn("nack failed", output.getvalue())
+
+    @unittest.skipIf(sys.version_info < (3, 11), "Task.cancelling() requires Python 3.11+")
+    async def test_subscribe_survives_handler_cancelled_error(self):
+        address = "mem:test/handler-cancelled"
+        received_msgs = []
+
+        async def on_receive(msg):
+            if msg.body == "cancel":
+                raise asyncio.CancelledError()
+            received_msgs.append(msg)
+
+        await self.mailbox.subscribe(address, on_receive)
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            for body in ("cancel", "good"):
+                await self.mailbox.post(OutgoingMail(
+                    from_="mem:test/sender",
+                    to=address,
+                    body=body
+                ))
+            await asyncio.sleep(0.1)
+
+        self.assertEqual([m.body for m in received_msgs], ["good"])
+
+    async def test_unsubscribe(self):
+        address = "mem:test/unsubscribe"
+        received_msgs = []
+
+        async def on_receive(msg):
+            received_msgs.append(msg)
+
+        subscription = await self.mailbox.subscribe(address, on_receive)
+        await subscription.unsubscribe()
+        # A second unsubscribe is a no-op
+        await subscription.unsubscribe()
+
+        await self.mailbox.post(OutgoingMail(
+            from_="mem:test/sender",
+            to=address,
+            body="content"
+        ))
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(received_msgs, [])
+        status = await self.mailbox.status(address)
+        self.assertEqual(status.extra['subscriber_count'], 0)
+
+    async def test_unsubscribe_delivers_queued_messages(self):
+        for eager_dispatch in (True, False):
+            with self.subTest(eager_dispatch=eager_dispatch):
+                mailbox = Mailbox()
+                mailbox.register_provider(MemoryProvider(eager_dispatch=eager_dispatch))
+                address = f"mem:test/unsubscribe-queued-{eager_dispatch}"
+                received_msgs = []
+
+                async def on_receive(msg):
+                    received_msgs.append(msg)
+
+                subscription = await mailbox.subscribe(address, on_receive)
+                for i in range(3):
+                    await mailbox.post(OutgoingMail(
+                        from_="mem:test/sender",
+                        to=address,
+                        body=i
+                    ))
+                await subscription.unsubscribe()
+
+                await asyncio.sleep(0.1)
+
+                self.assertEqual([m.body for m in received_msgs], [0, 1, 2])
+
+    async def test_unsubscribe_from_handler(self):
+        address = "mem:test/unsubscribe-self"
+        events = []
+
+        async def on_receive(msg):
+            events.append(msg.body)
+            if msg.body == "first":
+                await subscription.unsubscribe()
+                await asyncio.sleep(0)
+                events.append("handler finished")
+
+        subscription = await self.mailbox.subscribe(address, on_receive)
+        for body in ("first", "second"):
+            await self.mailbox.post(OutgoingMail(
+                from_="mem:test/sender",
+                to=address,
+                body=body
+            ))
+        await asyncio.sleep(0.1)
+
+        await self.mailbox.post(OutgoingMail(
+            from_="mem:test/sender",
+            to=address,
+            body="third"
+        ))
+        await asyncio.sleep(0.1)
+
+        self.assertEqual(events, ["first", "handler finished", "second"])
+
+    async def test_subscription_released_when_worker_cancelled(self):
+        address = "mem:test/worker-cancelled"
+        received_msgs = []
+
+        async def on_receive(msg):
+            received_msgs.append(msg)
+
+        await self.mailbox.subscribe(address, on_receive)
+        (info,) = self.provider._subscriptions.values()
+        info.worker.cancel()
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(self.provider._subscriptions, {})
+        status = await self.mailbox.status(address)
+        self.assertEqual(status.extra['subscriber_count'], 0)
+
+        await self.mailbox.post(OutgoingMail(
+            from_="mem:test/sender",
+            to=address,
+            body="content"
+        ))
+        self.assertEqual(info.queue.qsize(), 0)
+        # Still available to pull consumers
+        status = await self.mailbox.status(address)
+        self.assertEqual(status.unread_count, 1)
+
+    async def test_subscribe_listener_that_awaits(self):
+        address = "mem:test/slow"
+        received_msgs = []
+
+        async def on_receive(msg):
+            await asyncio.sleep(0.01)
+            received_msgs.append(msg)
+
+        await self.mailbox.subscribe(address, on_receive)
+
+        await self.mailbox.post(OutgoingMail(
+            from_="mem:test/sender",
+            to=address,
+            body="first"
+        ))
+        await self.mailbox.post(OutgoingMail(
+            from_="mem:test/sender",
+            to=address,
+            body="second"
+        ))
+
+        await asyncio.sleep(0.1)
+
+        # Messages for one subscription are delivered one at a time, in order
+        self.assertEqual([m.body for m in received_msgs], ["first", "second"])
+
+    async def test_publish_eager_dispatch(self):
+        bus = self.provider.bus
+        received_msgs = []
+
+        async def listener(msg):
+            received_msgs.append(msg)
+
+        unsubscribe = bus.subscribe("test/eager", listener)
+        message = MailMessage(id="eager1", from_="mem:test/sender", to="mem:test/eager", body="content")
+
+        # A listener that never suspends has already run when publish returns
+        await bus.publish("test/eager", message)
+        self.assertEqual(received_msgs, [message])
+
+        # Without eager dispatch it only runs on a later loop iteration
+        await bus.publish("test/eager", message, eager=False)
+        self.assertEqual(received_msgs, [message])
+        await asyncio.sleep(0)
+        self.assertEqual(received_msgs, [message, message])
+
+        unsubscribe()
+
+    async def test_post_to_subscription_creates_no_tasks(self):
+        address = "mem:test/no-tasks"
+        received_msgs = []
+
+        async def on_receive(msg):
+            received_msgs.append(msg)
+
+        await self.mailbox.subscribe(address, on_receive)
+
+        loop = asyncio.get_running_loop()
+        created = []
+
+        def counting_factory(loop, coro, **kwargs):
+            created.append(coro)
+            return asyncio.Task(coro, loop=loop, **kwargs)
+
+        loop.set_task_factory(counting_factory)
+        try:
+            for i in range(100):
+                await self.mailbox.post(OutgoingMail(
+                    from_="mem:test/sender",
+                    to=address,
+                    body=i
+                ))
+        finally:
+            loop.set_task_factory(None)
+
+        self.assertEqual(created, [])
+        await asyncio.sleep(0.1)
+        self.assertEqual(len(received_msgs), 100)
+
+    async def test_publish_survives_listener_cancelled_error(self):
+        bus = self.provider.bus
+        loop = asyncio.get_running_loop()
+        errors = []
+        received_msgs = []
+
+        async def cancelling_listener(msg):
+            raise asyncio.CancelledError()
+
+        async def listener(msg):
+            received_msgs.append(msg)
+
+        unsubscribes = [
+            bus.subscribe("test/listener-cancelled", cancelling_listener),
+            bus.subscribe("test/listener-cancelled", listener),
+        ]
+        message = MailMessage(id="cancelled1", from_="mem:test/sender", to="mem:test/listener-cancelled", body="content")
+
+        loop.set_exception_handler(lambda loop, context: errors.append(context))
+        try:
+            await bus.publish("test/listener-cancelled", message)
+        finally:
+            loop.set_exception_handler(None)
+
+        self.assertEqual(received_msgs, [message])
+        self.assertEqual(bus.get_status("test/listener-cancelled")['unread_count'], 1)
+        self.assertIsInstance(errors[0]['exception'], asyncio.CancelledError)
+
+        for unsubscribe in unsubscribes:
+            unsubscribe()
+
+    async def test_publish_listener_context_is_isolated(self):
+        bus = self.provider.bus
+        var = contextvars.ContextVar("var", default="publisher")
+        seen = []
+
+        async def listener(msg):
+            var.set("listener")
+            seen.append(var.get())
+            await asyncio.sleep(0)
+            seen.append(var.get())
+
+        unsubscribe = bus.subscribe("test/context", listener)
+        message = MailMessage(id="context1", from_="mem:test/sender", to="mem:test/context", body="content")
+
+        await bus.publish("test/context", message)
+        self.assertEqual(var.get(), "publisher")
+
+        await asyncio.sleep(0.01)
+        self.assertEqual(seen, ["listener", "listener"])
+        self.assertEqual(var.get(), "publisher")
+
+        unsubscribe()
+
+    async def test_publish_batch(self):
+        address = "mem:test/batch"
+        received_msgs = []
+
+        async def on_receive(msg):
+            received_msgs.append(msg)
+
+        await self.mailbox.subscribe(address, on_receive)
+
+        messages = [
+            MailMessage(id=f"batch{i}", from_="mem:test/sender", to=address, body=i)
+            for i in range(3)
+        ]
+        await self.provider.bus.publish_batch("test/batch", messages)
+
+        await asyncio.sleep(0.1)
+
+        self.assertEqual([m.body for m in received_msgs], [0, 1, 2])
+        status = await self.mailbox.status(address)
+        self.assertEqual(status.unread_count, 3)
+
     async def test_fetch_auto_ack(self):
         address = "mem:test/fetch"
         mail = OutgoingMail(
@@ -106,6 +447,63 @@ class TestMailbox(unittest.IsolatedAsyncioTestCase):
         self.assertIsNotNone(msg2)
         self.assertEqual(msg2.message.id, "msg3")
 
+    async def test_fetch_requeue_stale(self):
+        address = "mem:test/stale"
+        for i in range(2):
+            await self.mailbox.post(OutgoingMail(
+                from_="mem:test/sender",
+                to=address,
+                body="content",
+                id=f"stale{i}"
+            ))
+
+        options = FetchOptions(manual_ack=True, ack_timeout=0.05)
+
+        first = await self.mailbox.fetch(address, options)
+        self.assertEqual(first.message.id, "stale0")
+
+        await asyncio.sleep(0.1)
+
+        # stale0 timed out and is requeued ahead of stale1; stale1 is still fresh
+        second = await self.mailbox.fetch(address, options)
+        self.assertEqual(second.message.id, "stale0")
+        third = await self.mailbox.fetch(address, options)
+        self.assertEqual(third.message.id, "stale1")
+
+        await second.ack()
+        await third.ack()
+        self.assertIsNone(await self.mailbox.fetch(address, options))
+
+    async def test_address_with_leading_whitespace(self):
+        mail = OutgoingMail(
+            from_="mem:test/sender",
+            to=" mem:test/whitespace",
+            body="content",
+            id="ws1"
+        )
+
+        await self.mailbox.post(mail)
+
+        msg = await self.mailbox.fetch("mem:test/whitespace", FetchOptions(manual_ack=False))
+        self.assertIsNotNone(msg)
+        self.assertEqual(msg.id, "ws1")
+
+    async def test_address_parsed_once(self):
+        address = "mem:test/parse-once"
+        utils.get_canonical_mailbox_address_identifier.cache_clear()
+
+        with mock.patch.object(utils, 'urlparse', wraps=urlparse) as parse:
+            for _ in range(3):
+                await self.mailbox.post(OutgoingMail(
+                    from_="mem:test/sender",
+                    to=address,
+                    body="content"
+                ))
+            await self.mailbox.fetch(address, FetchOptions(manual_ack=False))
+            await self.mailbox.status(address)
+
+        self.assertEqual(parse.call_count, 1)
+
     async def test_status(self):
         address = "mem:test/status"
         mail = OutgoingMail(
@@ -119,6 +517,45 @@ class TestMailbox(unittest.IsolatedAsyncioTestCase):
         status = await self.mailbox.status(address)
         self.assertEqual(status.unread_count, 1)
         self.assertEqual(status.state, "online")
+        self.assertIsNotNone(status.last_activity_time)
+
+class TestMailboxAcrossLoops(unittest.TestCase):
+    def test_subscription_released_when_loop_closes(self):
+        mailbox = Mailbox()
+        provider = MemoryProvider()
+        mailbox.register_provider(provider)
+        address = "mem:test/loop-closed"
+        received_msgs = []
+
+        async def on_receive(msg):
+            received_msgs.append(msg.body)
+
+        async def post(*bodies):
+            for body in bodies:
+                await mailbox.post(OutgoingMail(
+                    from_="mem:test/sender",
+                    to=address,
+                    body=body
+                ))
+            await asyncio.sleep(0.01)
+
+        async def subscribe_and_post():
+            await mailbox.subscribe(address, on_receive)
+            await post(1)
+
+        async def status():
+            return await mailbox.status(address)
+
+        asyncio.run(subscribe_and_post())
+        asyncio.run(post(2, 3, 4))
+
+        # The worker died with its loop, so the subscription is gone rather than
+        # silently buffering messages nobody delivers.
+        self.assertEqual(received_msgs, [1])
+        self.assertEqual(provider._subscriptions, {})
+        result = asyncio.run(status())
+        self.assertEqual(result.extra['subscriber_count'], 0)
+        self.assertEqual(result.unread_count, 4)
 
 if __name__ == '__main__':
     unittest.main()
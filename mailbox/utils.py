@@ -1,5 +1,28 @@
+from datetime import datetime, timezone
+from functools import lru_cache
 from urllib.parse import urlparse
+import time
 
+_UTC = timezone.utc
+_fromtimestamp = datetime.fromtimestamp
+
+# [formatted timestamp, time.time() it was formatted at]
+_utc_now_cache = ['', 0.0]
+
+def utc_now_isoformat(resolution: float = 0.001) -> str:
+    """
+    Returns the current UTC time as an ISO 8601 string.
+    The last formatted value is reused while it is less than `resolution` seconds old;
+    pass 0 to always format the exact current time.
+    """
+    now = time.time()
+    if not 0 <= now - _utc_now_cache[1] < resolution:
+        _utc_now_cache[:] = [_fromtimestamp(now, _UTC).isoformat(), now]
+    return _utc_now_cache[0]
+
+# The same few addresses are resolved on every send/subscribe/fetch/status call,
+# so cache the canonical form per address string.
+@lru_cache(maxsize=4096)
 def get_canonical_mailbox_address_identifier(address_url: str) -> str:
     """
     Returns the canonical identifier for a mailbox address.